@@ -4,22 +4,29 @@ import csv
 import zipfile
 import shutil
 import logging
+import logging.handlers
 import io
+import datetime
 from openpyxl import load_workbook
 import tempfile
-from datetime import datetime
+import threading
+import time
+from contextlib import closing
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # ------------------------------------------------------------
 # Cooperative cancellation
 # ------------------------------------------------------------
-CANCEL_FLAG = False
+# An Event rather than a bare global: set from the GUI thread, polled by
+# the converter and its packaging worker threads.
+CANCEL_EVENT = threading.Event()
 
 def request_cancel():
-    global CANCEL_FLAG
-    CANCEL_FLAG = True
+    CANCEL_EVENT.set()
 
 def check_cancel():
-    if CANCEL_FLAG:
+    if CANCEL_EVENT.is_set():
         raise RuntimeError("Conversion cancelled by user.")
 
 # ------------------------------------------------------------
@@ -31,8 +38,19 @@ REQUIRED_COLUMNS = [
 ]
 
 ENCODING = "utf-8"
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm")
+STL_EXTENSIONS = (".stl",)
 MAX_ZIP_SIZE_MB = 900
 MAX_ZIP_SIZE_BYTES = MAX_ZIP_SIZE_MB * 1024 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024  # chunk size when streaming STLs into a ZIP
+ZIP_WRITE_BUFFER_SIZE = 8 * 1024 * 1024  # output buffer per archive being written
+ZIP_ENTRY_OVERHEAD = 128  # local + central header bytes per entry, besides the name (stored twice)
+ZIP_ARCHIVE_OVERHEAD = 64 * 1024  # meta.csv headers and deflate slack, end-of-archive records
+MAX_PACKAGING_WORKERS = 4  # concurrent archive writers; packaging is disk-bound
+EMPTY_COPIES = frozenset(("", "0"))  # copies values corrected to 1
+EMPTY_CELLS = frozenset((None, "", " "))  # cell values that count as blank
+INT_FLOAT_LIMIT = 1e16  # whole numbers from here up are stored in exponent form, read as float
+ERROR_CELL_MARKERS = (b't="e"', b"t='e'")  # cell type attribute of #N/A, #DIV/0!, ... in sheet XML
 
 # ------------------------------------------------------------
 # Helpers
@@ -67,96 +85,183 @@ def setup_logger(log_path: str | None = None, external_logger: logging.Logger |
         fh.setLevel(logging.INFO)
         formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(message)s")
         fh.setFormatter(formatter)
-        logger.addHandler(fh)
+        # Buffer records and write them in one go instead of one write per line;
+        # errors still reach the file immediately.
+        logger.addHandler(logging.handlers.MemoryHandler(
+            capacity=1000, flushLevel=logging.ERROR, target=fh))
 
     logger.info("=" * 60)
     logger.info("Converter started (standalone mode)")
     return logger
 
+def report(logger: logging.Logger, message: str) -> None:
+    """Logs a progress message and echoes it to the console, formatting it only once."""
+    logger.info(message)
+    print(message)
+
+def flush_log_buffers(logger: logging.Logger) -> None:
+    """Writes out any records held by buffering handlers attached in setup_logger."""
+    for h in logger.handlers:
+        if isinstance(h, logging.handlers.MemoryHandler):
+            h.flush()
+
 # ------------------------------------------------------------
 # Excel → CSV (in-memory)
 # ------------------------------------------------------------
-def convert_excel_to_csv_buffer(excel_path: str, logger: logging.Logger) -> io.StringIO:
-    """Reads Excel and returns its meta.csv as an in-memory buffer."""
-    import pandas as pd
-    logger.info(f"Converting Excel to CSV (in-memory): {excel_path}")
-
-    wb = load_workbook(excel_path, data_only=True)
-    removed = 0
-    for sheet in wb.sheetnames[:]:
-        ws = wb[sheet]
-        if not any(any(cell not in (None, "", " ") for cell in row) for row in ws.iter_rows(values_only=True)):
-            wb.remove(ws)
-            logger.info(f"Removed empty sheet: {sheet}")
-            removed += 1
+def calamine_value(value):
+    """Converts a python-calamine cell value to what openpyxl reads for the same cell."""
+    if type(value) is float and value.is_integer() and -INT_FLOAT_LIMIT < value < INT_FLOAT_LIMIT:
+        return int(value)  # calamine reports every number as float
+    if type(value) is datetime.date:
+        # openpyxl reads date-only cells as datetimes at midnight
+        return datetime.datetime.combine(value, datetime.time())
+    return value
+
+def has_error_cells(excel_path: str) -> bool:
+    """
+    True if any worksheet holds an error value (#N/A, #DIV/0!, ...). Scans
+    the raw sheet XML in C instead of parsing it; a false hit only costs the
+    slower reader.
+    """
+    with zipfile.ZipFile(excel_path) as zf:
+        for name in zf.namelist():
+            if not (name.startswith("xl/worksheets/") and name.endswith(".xml")):
+                continue
+            with zf.open(name) as fh:
+                tail = b""
+                while chunk := fh.read(COPY_BUFFER_SIZE):
+                    data = tail + chunk
+                    if any(marker in data for marker in ERROR_CELL_MARKERS):
+                        return True
+                    tail = data[-8:]  # a marker may straddle two chunks
+    return False
+
+def sheet_rows(excel_path: str):
+    """
+    Yields (title, visible, rows) for every sheet: visible sheets first, in
+    workbook order, then hidden ones, all from a single open workbook.
+    Uses python-calamine's native parser when it is installed and accepts the
+    file, otherwise openpyxl's read_only reader. Workbooks with error cells
+    always go through openpyxl: calamine reads those cells as empty strings.
+    """
+    try:
+        from python_calamine import CalamineWorkbook, SheetVisibleEnum
+        wb = None if has_error_cells(excel_path) else CalamineWorkbook.from_path(excel_path)
+    except Exception:
+        wb = None  # not installed, or calamine rejects the file
+
+    if wb is not None:
+        sheets = sorted(wb.sheets_metadata, key=lambda s: s.visible != SheetVisibleEnum.Visible)
+        for sheet in sheets:
+            rows = wb.get_sheet_by_name(sheet.name).to_python(skip_empty_area=False)
+            # Cell values are mapped so meta.csv matches the openpyxl path
+            yield sheet.name, sheet.visible == SheetVisibleEnum.Visible, (
+                [calamine_value(v) for v in row] for row in rows
+            )
+        return
+
+    # read_only streams cells instead of building the full workbook DOM
+    wb = load_workbook(excel_path, data_only=True, read_only=True)
+    try:
+        for ws in sorted(wb.worksheets, key=lambda ws: ws.sheet_state != "visible"):
+            yield ws.title, ws.sheet_state == "visible", ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
 
-    import tempfile
+def sheet_to_meta_buffer(rows, logger: logging.Logger) -> io.StringIO | None:
+    """
+    Validates and fixes a sheet's rows straight into meta.csv in a single pass.
+    Returns None if the sheet has no non-blank cell.
+    """
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return None
+    # issuperset walks the cells in C and stops at the first non-blank one
+    if EMPTY_CELLS.issuperset(header) and EMPTY_CELLS.issuperset(chain.from_iterable(rows)):
+        return None
+    return fix_meta_rows(header, rows, logger)
+
+def convert_excel_to_meta_buffer(excel_path: str, logger: logging.Logger) -> io.StringIO:
+    """Reads Excel and returns its validated meta.csv as an in-memory buffer."""
+    logger.info(f"Converting Excel to CSV (in-memory): {excel_path}")
 
-    if removed:
-        # Save cleaned workbook into a hidden temporary file in the system temp directory
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp_file:
-            temp_cleaned_path = tmp_file.name
+    # Fixups are applied while the chosen sheet is streamed, so its rows are
+    # read once and never round-trip through an intermediate CSV.
+    meta_buf = None
+    warned = False
+    with closing(sheet_rows(excel_path)) as sheets:
+        for title, visible, rows in sheets:
+            if not visible and not warned:
+                # Hidden sheets come from the same open workbook, no second parse
+                logger.warning("No usable visible sheet — trying hidden sheets.")
+                warned = True
+            meta_buf = sheet_to_meta_buffer(rows, logger)
+            if meta_buf is not None:
+                break
+            logger.info(f"Skipped empty sheet: {title}")
+
+    if meta_buf is None:
+        raise ValueError(f"No non-empty worksheet found in {os.path.basename(excel_path)}")
 
-        try:
-            wb.save(temp_cleaned_path)
-            wb.close()
-            # Reopen the cleaned workbook safely
-            wb = load_workbook(temp_cleaned_path, data_only=True, read_only=True)
-
-        finally:
-            # Delete the cleaned file immediately after (user never sees it)
-            try:
-                os.remove(temp_cleaned_path)
-            except OSError:
-                pass
-
-    ws = next((s for s in wb.worksheets if s.sheet_state == "visible"), None)
-    if ws is None:
-        logger.warning("No visible sheets — using pandas fallback.")
-        df = pd.read_excel(excel_path, engine="openpyxl")
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False, encoding=ENCODING)
-        csv_buffer.seek(0)
-        return csv_buffer
-
-    csv_buffer = io.StringIO()
-    writer = csv.writer(csv_buffer)
-    for row in ws.iter_rows(values_only=True):
-        writer.writerow(["" if v is None else str(v) for v in row])
-    csv_buffer.seek(0)
     logger.info("Conversion to meta.csv completed (in-memory).")
-    return csv_buffer
+    return meta_buf
 
 # ------------------------------------------------------------
 # CSV validation
 # ------------------------------------------------------------
-def validate_and_fix_meta_buffer(csv_buffer: io.StringIO, logger: logging.Logger) -> io.StringIO:
-    """Validates and fixes meta.csv content, returning updated in-memory buffer."""
-    csv_buffer.seek(0)
-    reader = csv.DictReader(csv_buffer)
-    rows = list(reader)
-    header = reader.fieldnames
+def fix_meta_rows(header, rows, logger: logging.Logger) -> io.StringIO:
+    """
+    Checks the header and writes the rows as meta.csv, fixing copies and
+    filename on the way. Cells are the raw values read from Excel.
+    """
     if header is None:
         raise ValueError("meta.csv missing header row")
 
-    if [h.strip().lower() for h in header[: len(REQUIRED_COLUMNS)]] != REQUIRED_COLUMNS:
-        raise ValueError(f"Header mismatch. Found: {header}, Expected: {REQUIRED_COLUMNS}")
+    found = ["" if h is None else str(h).strip().lower() for h in header[: len(REQUIRED_COLUMNS)]]
+    if found != REQUIRED_COLUMNS:
+        raise ValueError(f"Header mismatch. Found: {list(header)}, Expected: {REQUIRED_COLUMNS}")
 
-    fixed_copies = fixed_filenames = 0
-    for row in rows:
-        check_cancel()
-        if (row.get("copies") or "").strip() in ("", "0"):
-            row["copies"] = "1"
-            fixed_copies += 1
-        fname = (row.get("filename") or "").strip()
-        if fname and not fname.lower().endswith(".stl"):
-            row["filename"] = fname + ".stl"
-            fixed_filenames += 1
+    # Fixed schema: address columns by position instead of building a dict per row
+    width = len(REQUIRED_COLUMNS)
+    idx = {c: i for i, c in enumerate(REQUIRED_COLUMNS)}
+    copies_idx, filename_idx = idx["copies"], idx["filename"]
 
+    # Single pass: fix each row and write it out immediately instead of
+    # materializing the whole sheet first
     out_buf = io.StringIO()
-    writer = csv.DictWriter(out_buf, fieldnames=REQUIRED_COLUMNS)
-    writer.writeheader()
-    writer.writerows(rows)
+    writer = csv.writer(out_buf)
+    writer.writerow(REQUIRED_COLUMNS)
+
+    fixed_copies = fixed_filenames = 0
+
+    def fixed_rows():
+        nonlocal fixed_copies, fixed_filenames
+        for row in rows:
+            check_cancel()
+            if not row:
+                continue
+            row = list(row[:width])
+            if len(row) < width:
+                row.extend([""] * (width - len(row)))
+            # Only non-string cell values need converting
+            copies = row[copies_idx]
+            if type(copies) is not str:
+                copies = "" if copies is None else str(copies)
+            if copies.strip() in EMPTY_COPIES:
+                row[copies_idx] = "1"
+                fixed_copies += 1
+            fname = row[filename_idx]
+            if type(fname) is not str:
+                fname = "" if fname is None else str(fname)
+            fname = fname.strip()
+            if fname and fname[-4:].lower() != ".stl":
+                row[filename_idx] = fname + ".stl"
+                fixed_filenames += 1
+            yield row
+
+    # csv's C writer does the quoting; writerows avoids a Python call per row
+    writer.writerows(fixed_rows())
     out_buf.seek(0)
 
     if fixed_copies:
@@ -170,79 +275,156 @@ def validate_and_fix_meta_buffer(csv_buffer: io.StringIO, logger: logging.Logger
 # ------------------------------------------------------------
 # ZIP packaging (RAM meta)
 # ------------------------------------------------------------
-import time
-import zipfile
-import os
-
-def zip_with_limit(file_list, base_dir, zip_base_name, meta_buf, workdir, logger):
+def plan_zip_parts(file_list, max_bytes: int = MAX_ZIP_SIZE_BYTES) -> list[list]:
     """
-    Create one or more ZIPs (900 MB each) for the given STL files.
-    Files are read from `base_dir`, but ZIPs are always written to `workdir`.
+    Splits STL entries into consecutive parts whose stored size (data plus
+    zip headers) stays within `max_bytes` (sizes from stat only).
     """
-    import time
-    MAX_ZIP_SIZE_MB = 900
-    MAX_ZIP_SIZE_BYTES = MAX_ZIP_SIZE_MB * 1024 * 1024
+    parts, current, current_size = [], [], 0
+    for entry in file_list:
+        if not entry.is_file():
+            continue
+        file_size = entry.stat().st_size + ZIP_ENTRY_OVERHEAD + 2 * len(entry.name.encode(ENCODING))
+        if current and current_size + file_size > max_bytes:
+            parts.append(current)
+            current, current_size = [], 0
+        current.append(entry)
+        current_size += file_size
+    if current:
+        parts.append(current)
+    return parts
 
-    os.makedirs(workdir, exist_ok=True)
-    zip_paths = []
+def remove_quietly(path: str) -> None:
+    """Deletes `path` if it exists."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
 
-    current_zip_index = 1
-    current_zip = None
-    current_size = 0
+def write_zip_part(entries, zip_path, meta_bytes, logger, on_file_added=None) -> str:
+    """
+    Writes one ZIP_STORED archive containing `entries` (and meta.csv if given).
+    The archive is built under a temporary name and only renamed to
+    `zip_path` after a clean close, so a cancelled or failed part never
+    looks like a finished one.
+    """
+    zip_name = os.path.basename(zip_path)
+    tmp_path = zip_path + ".tmp"
+    report(logger, f"Started new archive: {zip_name}")
     start_time = time.time()
+    size = 0
 
-    def new_zip():
-        nonlocal current_zip, current_zip_index, current_size
-        zip_name = f"{zip_base_name}_part{current_zip_index}.zip"
-        zip_path = os.path.join(workdir, zip_name)
-        current_zip = zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED)
-        zip_paths.append(zip_path)
-        current_size = 0
-        logger.info(f"Started new archive: {zip_name}")
-        print(f"Started new archive: {zip_name}")
-        return zip_path
-
-    # start the first archive
-    new_zip()
-    total_files = len(file_list)
-
-    for i, filename in enumerate(file_list, start=1):
-        full_path = os.path.join(base_dir, filename)
-        if not os.path.isfile(full_path):
-            continue
-        rel_path = os.path.relpath(full_path, base_dir)
-        file_size = os.path.getsize(full_path)
-
-        if current_size + file_size > MAX_ZIP_SIZE_BYTES:
-            # close and start new zip
-            current_zip.close()
-            elapsed = time.time() - start_time
-            size_mb = current_size / (1024 * 1024)
-            logger.info(f"Closed archive {current_zip_index} ({size_mb:.1f} MB in {elapsed:.1f}s, {size_mb/elapsed:.1f} MB/s)")
-            current_zip_index += 1
-            new_zip()
-            start_time = time.time()
-
-        with open(full_path, "rb") as f:
-            data = f.read()
-        current_zip.writestr(rel_path, data)
-        current_size += file_size
+    try:
+        # A large output buffer turns the 1 MiB entry copies into fewer, bigger writes
+        with open(tmp_path, "wb", buffering=ZIP_WRITE_BUFFER_SIZE) as fh, \
+                zipfile.ZipFile(fh, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for entry in entries:
+                check_cancel()
+                st = entry.stat()
+                mtime = max(time.localtime(st.st_mtime)[:6], (1980, 1, 1, 0, 0, 0))
+                zinfo = zipfile.ZipInfo(entry.name, date_time=mtime)
+                zinfo.file_size = st.st_size
+                # Stream in 1 MiB chunks instead of reading the whole STL into memory
+                with open(entry.path, "rb", buffering=0) as src, zf.open(zinfo, "w") as dst:
+                    shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+                size += st.st_size
+                if on_file_added:
+                    on_file_added()
+
+            if meta_bytes:
+                # STLs are stored as-is; the small text meta.csv still deflates well
+                zf.writestr("meta.csv", meta_bytes,
+                            compress_type=zipfile.ZIP_DEFLATED, compresslevel=1)
+        os.replace(tmp_path, zip_path)
+    except BaseException:
+        # ZipFile still writes its central directory when an exception
+        # unwinds the with-block; drop that half-filled archive
+        remove_quietly(tmp_path)
+        raise
 
+    elapsed = time.time() - start_time
+    size_mb = size / (1024 * 1024)
+    rate = size_mb / elapsed if elapsed else 0.0
+    stats = f"({size_mb:.1f} MB in {elapsed:.1f}s, {rate:.1f} MB/s)"
+    logger.info(f"Closed archive: {zip_path} {stats}")
+    print(f"Closed archive: {zip_name} {stats}")
+    return zip_path
+
+def plan_archives(file_list, zip_base_name, workdir, meta_bytes) -> list[tuple[str, list]]:
+    """
+    Plans the 900 MB parts for the given STL files as (zip_path, entries)
+    pairs in `workdir`. Every part also carries meta.csv, so its size and
+    the archive's own records come off the STL budget.
+    """
+    budget = MAX_ZIP_SIZE_BYTES - len(meta_bytes or b"") - ZIP_ARCHIVE_OVERHEAD
+    parts = plan_zip_parts(file_list, budget) or [[]]
+    return [(os.path.join(workdir, f"{zip_base_name}_part{n}.zip"), part)
+            for n, part in enumerate(parts, start=1)]
+
+def find_archive_clash(planned) -> tuple[str, str, str] | None:
+    """
+    Returns (zip_name, first_label, second_label) if two archive groups in
+    `planned` ((label, archives) pairs) would write the same path, e.g. a
+    subfolder named "root" next to root-level STLs. Names are compared
+    case-insensitively, as on Windows.
+    """
+    seen = {}
+    for label, archives in planned:
+        for zip_path, _ in archives:
+            key = zip_path.lower()
+            if key in seen:
+                return os.path.basename(zip_path), seen[key], label
+            seen[key] = label
+    return None
+
+def submit_zip_parts(pool, label, archives, meta_bytes, logger) -> list:
+    """
+    Submits one write_zip_part job per planned (zip_path, entries) part to
+    `pool`; every part gets `meta_bytes` as meta.csv. Progress is reported
+    under `label`, as groups share the pool and their lines interleave.
+    Returns (zip_path, future) pairs in part order; each future resolves to
+    its archive path.
+    """
+    total_files = sum(len(entries) for _, entries in archives)
+    added = 0
+    announced = False
+    added_lock = threading.Lock()
+
+    def on_file_added():
+        nonlocal added
+        with added_lock:
+            added += 1
+            i = added
         if i % 50 == 0 or i == total_files:
-            print(f"Added {i}/{total_files} files so far...")
-            logger.info(f"Added {i}/{total_files} files so far...")
+            report(logger, f"{label}: added {i}/{total_files} files so far...")
 
-    # finalize last archive
-    if meta_buf:
-        current_zip.writestr("meta.csv", meta_buf.getvalue())
-    current_zip.close()
+    def write_part(entries, zip_path):
+        nonlocal announced
+        # Announced when the group's first part starts, not when it is queued
+        with added_lock:
+            first, announced = not announced, True
+        if first:
+            report(logger, f"Packaging {label}...")
+        return write_zip_part(entries, zip_path, meta_bytes, logger, on_file_added)
 
-    elapsed = time.time() - start_time
-    size_mb = current_size / (1024 * 1024)
-    logger.info(f"Closed archive: {zip_paths[-1]} ({size_mb:.1f} MB in {elapsed:.1f}s, {size_mb/elapsed:.1f} MB/s)")
-    print(f"Closed archive: {os.path.basename(zip_paths[-1])} ({size_mb:.1f} MB in {elapsed:.1f}s, {size_mb/elapsed:.1f} MB/s)")
+    return [(path, pool.submit(write_part, part, path)) for path, part in archives]
 
-    return zip_paths
+def wait_for_parts(jobs) -> list[str]:
+    """
+    Collects archive paths in order from (zip_path, future) pairs. If a part
+    fails, parts not yet started are cancelled and, once the running ones
+    have settled, every part that did not finish is deleted.
+    """
+    try:
+        return [future.result() for _, future in jobs]
+    except BaseException:
+        for _, future in jobs:
+            future.cancel()
+        wait([future for _, future in jobs])
+        for zip_path, future in jobs:
+            if future.cancelled() or future.exception() is not None:
+                remove_quietly(zip_path)
+        raise
 
 # ------------------------------------------------------------
 # Main
@@ -261,8 +443,10 @@ def main(external_logger: logging.Logger | None = None) -> int:
 
     try:
         check_cancel()
-        excel_path = next((os.path.join(workdir, f) for f in sorted(os.listdir(workdir))
-                           if f.lower().endswith((".xlsx", ".xlsm"))), None)
+        with os.scandir(workdir) as it:
+            workdir_entries = sorted(it, key=lambda e: e.name)
+        excel_path = next((e.path for e in workdir_entries
+                           if e.is_file() and e.name.lower().endswith(EXCEL_EXTENSIONS)), None)
         if not excel_path:
             logger.error("No Excel file found.")
             return 1
@@ -271,23 +455,24 @@ def main(external_logger: logging.Logger | None = None) -> int:
         logger.info(f"Found Excel: {excel_path}")
 
         check_cancel()
-        csv_buffer = convert_excel_to_csv_buffer(excel_path, logger)
-        meta_buf = validate_and_fix_meta_buffer(csv_buffer, logger)
+        meta_buf = convert_excel_to_meta_buffer(excel_path, logger)
+        # Encoded once; the same bytes go into every archive
+        meta_bytes = meta_buf.getvalue().encode(ENCODING)
 
         check_cancel()
         logger.info("=== START SCANNING FOR STL FILES ===")
-        stl_folders, root_stls = [], []
-        for entry in sorted(os.listdir(workdir)):
-            p = os.path.join(workdir, entry)
-            if os.path.isdir(p):
-                if any(f.lower().endswith(".stl") for f in os.listdir(p)):
-                    stl_folders.append(p)
-            elif entry.lower().endswith(".stl"):
+        # folder name -> STL entries, collected in one scan per folder
+        stl_folders, root_stls = {}, []
+        for entry in workdir_entries:
+            if entry.is_dir():
+                with os.scandir(entry.path) as it:
+                    files = [f for f in it if f.name.lower().endswith(STL_EXTENSIONS) and f.is_file()]
+                if files:
+                    stl_folders[entry.name] = files
+            elif entry.name.lower().endswith(STL_EXTENSIONS):
                 root_stls.append(entry)
 
-        total = len(root_stls) + sum(
-            1 for f in stl_folders for fn in os.listdir(f) if fn.lower().endswith(".stl")
-        )
+        total = len(root_stls) + sum(len(files) for files in stl_folders.values())
         if total == 0:
             logger.error("No STL files found.")
             return 1
@@ -295,25 +480,32 @@ def main(external_logger: logging.Logger | None = None) -> int:
         logger.info(f"Found {total} STL files in total.")
         print(f"Found {total} STL files.\n")
 
+        # Every archive path is planned up front: parts are written
+        # concurrently, so two groups must never share a file name
+        groups = [(f"folder '{name}'", f"{basename}_{name}", files)
+                  for name, files in stl_folders.items()]
+        if root_stls:
+            groups.append(("root STL files", f"{basename}_root", root_stls))
+        planned = [(label, plan_archives(files, zip_base_name, workdir, meta_bytes))
+                   for label, zip_base_name, files in groups]
+        clash = find_archive_clash(planned)
+        if clash:
+            zip_name, first, second = clash
+            logger.error(f"Archive name clash: {zip_name} would be written for both "
+                         f"{first} and {second}. Rename the folder and try again.")
+            return 1
+
         # --- Use tempdir (RAM-backed on Windows) for transient I/O
         with tempfile.TemporaryDirectory() as tmp:
             logger.info("=== START PACKAGING ===")
-            for stl_folder in stl_folders:
-                check_cancel()
-                folder_name = os.path.basename(stl_folder)
-                print(f"Packaging folder '{folder_name}'...")
-                files = [f for f in os.listdir(stl_folder) if f.lower().endswith(".stl")]
-                zip_paths = zip_with_limit(files, stl_folder, f"{basename}_{folder_name}",
-                                           meta_buf, workdir, logger)
-                for zp in zip_paths:
-                    logger.info(f"Created archive: {zp} ({os.path.getsize(zp)/1024/1024:.2f} MB)")
-
-            if root_stls:
-                check_cancel()
-                print(f"Packaging root STL files ({len(root_stls)} parts)...")
-                zip_paths = zip_with_limit(root_stls, workdir, f"{basename}_root",
-                                           meta_buf, workdir, logger)
-                for zp in zip_paths:
+            # Folders are independent, so all their parts share one pool
+            with ThreadPoolExecutor(max_workers=MAX_PACKAGING_WORKERS) as pool:
+                jobs = []
+                for label, archives in planned:
+                    check_cancel()
+                    jobs += submit_zip_parts(pool, label, archives, meta_bytes, logger)
+
+                for zp in wait_for_parts(jobs):
                     logger.info(f"Created archive: {zp} ({os.path.getsize(zp)/1024/1024:.2f} MB)")
 
         logger.info("=== START CLEANUP ===")
@@ -329,16 +521,8 @@ def main(external_logger: logging.Logger | None = None) -> int:
         print(f"Unexpected error: {e}")
         return 1
     finally:
-        # Automatic cleanup — also remove log file & cleaned sheets
+        # Automatic cleanup — remove the standalone log file
         try:
-            for f in os.listdir(workdir):
-                if f.lower().startswith("_cleaned_") and f.lower().endswith((".xlsx", ".xlsm")):
-                    try:
-                        os.remove(os.path.join(workdir, f))
-                        logger.info(f"Deleted temp file: {f}")
-                    except Exception:
-                        logger.warning(f"Could not delete {f}: {e}")
-
             if log_path and os.path.exists(log_path):
                 try:
                     os.remove(log_path)
@@ -350,6 +534,7 @@ def main(external_logger: logging.Logger | None = None) -> int:
             logger.warning(f"Cleanup encountered error: {cleanup_error}")
 
         logger.info("Converter finished.")
+        flush_log_buffers(logger)
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
@@ -1,17 +1,35 @@
-import os
+import re
 import threading
 import logging
-import io
+import queue
 import customtkinter as ctk
 import converter
 
 
 APP_TITLE = "AM-Flow Converter"
-ENCODING = "utf-8"
+UI_POLL_MS = 50  # how often the Tk thread drains worker messages
+UI_MAX_MESSAGES = 500  # messages handled per drain, so a burst can't stall the UI
+MAX_LOG_LINES = 5000  # textbox is trimmed back to KEEP_LOG_LINES past this
+KEEP_LOG_LINES = 4000
+
+# Leading "2025-01-01 12:00:00,000 [INFO] " of file-formatted log lines
+TIMESTAMP_RE = re.compile(r"^\d{4}-\d{2}-\d{2} .*?\] ", re.MULTILINE)
+
+# Converter log phrase (lowercase) -> (progress value, progress label)
+PROGRESS_MAP = {
+    "found excel": (0.15, "Found Excel file"),
+    "converting excel": (0.25, "Converting Excel to CSV"),
+    "meta.csv validated": (0.45, "Validated meta.csv"),
+    "scanning for stl": (0.60, "Scanning STL files"),
+    "start packaging": (0.75, "Packaging ZIP archives"),
+    "start cleanup": (0.95, "Finalizing"),
+}
+# One case-insensitive scan finds every phrase instead of lower() plus a search per key
+PROGRESS_RE = re.compile("|".join(map(re.escape, PROGRESS_MAP)), re.IGNORECASE)
 
 
 class InMemoryLogHandler(logging.Handler):
-    """A handler that forwards log lines to the GUI directly."""
+    """A handler that queues log lines for the GUI; safe to use from worker threads."""
     def __init__(self, gui_ref):
         super().__init__()
         self.gui_ref = gui_ref
@@ -37,6 +55,12 @@ class ConverterGUI(ctk.CTk):
         self.cancel_requested = False
         self.logger = None
 
+        # Worker threads post (kind, payload) messages; only the Tk thread
+        # drains them and touches widgets
+        self.ui_queue = queue.SimpleQueue()
+        self.last_stage = ""
+        self.log_line_count = 0
+
         # --- Layout ---
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
@@ -88,18 +112,75 @@ class ConverterGUI(ctk.CTk):
 
         # --- Start automatically ---
         self.after(200, self.start_conversion)
+        self.after(UI_POLL_MS, self._drain_queue)
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
     # --- GUI helpers ---
     def append_text(self, message: str):
+        """Queues a log line; safe to call from any thread."""
+        self.ui_queue.put(("log", message.strip()))
+
+    def post(self, kind: str, payload=None):
+        """Queues a "status", "progress" or "done" update from a worker thread."""
+        self.ui_queue.put((kind, payload))
+
+    def _drain_queue(self):
+        # Consecutive log lines are written with a single insert/see; they are
+        # flushed before any status update so the two stay in order
+        lines = []
+        try:
+            for _ in range(UI_MAX_MESSAGES):
+                kind, payload = self.ui_queue.get_nowait()
+                if kind == "log":
+                    lines.append(payload)
+                    continue
+                if lines:
+                    self._show_log_lines(lines)
+                    lines = []
+                if kind == "status":
+                    self.set_status(payload)
+                elif kind == "progress":
+                    self.set_progress(*payload)
+                elif kind == "done":
+                    self.finish_conversion()
+        except queue.Empty:
+            pass
+
+        if lines:
+            self._show_log_lines(lines)
+        self.after(UI_POLL_MS, self._drain_queue)
+
+    def _show_log_lines(self, lines: list[str]):
+        text = TIMESTAMP_RE.sub("", "\n".join(lines))
         self.textbox.configure(state="normal")
-        self.textbox.insert("end", message.strip() + "\n")
+        self.textbox.insert("end", text + "\n")
+        self.log_line_count += text.count("\n") + 1
+        if self.log_line_count > MAX_LOG_LINES:
+            # Bounded backlog keeps insert/see cost flat on long runs
+            drop = self.log_line_count - KEEP_LOG_LINES
+            self.textbox.delete("1.0", f"{drop + 1}.0")
+            self.log_line_count = KEEP_LOG_LINES
         self.textbox.see("end")
         self.textbox.configure(state="disabled")
 
+        # Only the newest stage marker matters: search from the last line back
+        for line in reversed(lines):
+            match = PROGRESS_RE.search(line)
+            if match:
+                val, label = PROGRESS_MAP[match.group(0).lower()]
+                if label != self.last_stage:
+                    self.set_progress(label, val)
+                    self.last_stage = label
+                break
+
     def set_status(self, message: str):
         self.status_label.configure(text=message)
 
+    def set_progress(self, label: str, value: float | None = None):
+        if value is not None:
+            self.progress_bar.set(value)
+        self.progress_label.configure(text=label)
+
     def on_cancel(self):
         if self.running:
             self.cancel_requested = True
@@ -119,23 +200,25 @@ class ConverterGUI(ctk.CTk):
             return
         self.running = True
         self.cancel_requested = False
+        self.last_stage = ""
         self.close_button.configure(state="disabled")
         self.cancel_button.configure(state="normal")
         self.textbox.configure(state="normal")
         self.textbox.delete("1.0", "end")
+        self.log_line_count = 0
         self.textbox.configure(state="disabled")
 
         self.after(50, self.run_conversion)
 
+    def finish_conversion(self):
+        self.running = False
+        self.cancel_requested = False
+        self.cancel_button.configure(state="disabled")
+        self.close_button.configure(state="normal")
+
     def run_conversion(self):
-        import threading
-        import io
-        import re
-        import time
-
-        # Prepare in-memory log stream
-        log_stream = io.StringIO()
-        handler = logging.StreamHandler(log_stream)
+        # Converter log records go straight onto the GUI queue
+        handler = InMemoryLogHandler(self)
         handler.setFormatter(logging.Formatter("%(message)s"))
 
         # Use the same logger as the converter
@@ -146,86 +229,36 @@ class ConverterGUI(ctk.CTk):
 
         self.append_text("Converter started (RAM mode).")
         self.set_status("Running converter...")
-        self.progress_bar.set(0.0)
-        self.progress_label.configure(text="Starting...")
-        self.update_idletasks()
+        self.set_progress("Starting...", 0.0)
 
         # --- Backend Thread ---
+        # Tk widgets are only touched from the Tk thread: worker threads post
+        # every update to ui_queue instead.
         def backend_task():
             try:
                 exit_code = converter.main(converter_logger)
                 if exit_code == 0:
-                    self.set_status("All tasks completed successfully.")
-                    self.progress_bar.set(1.0)
-                    self.progress_label.configure(text="Completed.")
+                    self.post("status", "All tasks completed successfully.")
+                    self.post("progress", ("Completed.", 1.0))
+                elif self.cancel_requested:
+                    # main() reports the cancel itself and returns 1
+                    self.post("status", "Cancelled by user.")
+                    self.post("progress", ("Cancelled.",))
                 else:
-                    self.set_status("Conversion failed — check log.")
-                    self.progress_label.configure(text="Error.")
+                    self.post("status", "Conversion failed — check log.")
+                    self.post("progress", ("Error.",))
             except RuntimeError as e:
                 self.append_text(str(e))
-                self.set_status("Cancelled by user.")
-                self.progress_label.configure(text="Cancelled.")
+                self.post("status", "Cancelled by user.")
+                self.post("progress", ("Cancelled.",))
             except Exception as e:
                 self.append_text(f"Error: {e}")
-                self.set_status("Error occurred.")
-                self.progress_label.configure(text="Error.")
+                self.post("status", "Error occurred.")
+                self.post("progress", ("Error.",))
             finally:
-                self.running = False
-                self.cancel_requested = False
-                self.cancel_button.configure(state="disabled")
-                self.close_button.configure(state="normal")
-
-        backend_thread = threading.Thread(target=backend_task, daemon=True)
-        backend_thread.start()
-
-        # --- Live GUI updates from log stream ---
-        def tail_log():
-            last_pos = 0
-            last_stage = ""
-
-            progress_map = {
-                "found excel": (0.15, "Found Excel file"),
-                "converting excel": (0.25, "Converting Excel to CSV"),
-                "validating meta": (0.45, "Validating meta.csv"),
-                "scanning for stl": (0.60, "Scanning STL files"),
-                "creating zip": (0.75, "Packaging ZIP archives"),
-                "cleanup complete": (0.95, "Finalizing"),
-                "converter finished": (1.0, "Completed"),
-            }
-
-            while backend_thread.is_alive():
-                log_text = log_stream.getvalue()
-                new_text = log_text[last_pos:]
-                last_pos = len(log_text)
-
-                if new_text.strip():
-                    # Remove timestamps and clean lines
-                    clean_lines = re.sub(r"^\d{4}-\d{2}-\d{2} .*?\] ", "", new_text, flags=re.MULTILINE)
-                    self.append_text(clean_lines.strip())
-
-                    # Check for progress hints
-                    lower_text = clean_lines.lower()
-                    for key, (val, label) in progress_map.items():
-                        if key in lower_text and label != last_stage:
-                            self.progress_bar.set(val)
-                            self.progress_label.configure(text=label)
-                            self.update_idletasks()
-                            last_stage = label
-                            break
-
-                time.sleep(0.2)
-
-            # Final read when thread completes
-            remaining = log_stream.getvalue()[last_pos:]
-            if remaining.strip():
-                clean_lines = re.sub(r"^\d{4}-\d{2}-\d{2} .*?\] ", "", remaining, flags=re.MULTILINE)
-                self.append_text(clean_lines.strip())
-
-            self.progress_bar.set(1.0)
-            self.set_status("Done.")
-            self.progress_label.configure(text="Completed")
-
-        threading.Thread(target=tail_log, daemon=True).start()
+                self.post("done")
+
+        threading.Thread(target=backend_task, daemon=True).start()
 
 def main():
     app = ConverterGUI()
@@ -0,0 +1,112 @@
+import datetime
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from openpyxl import Workbook
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import converter
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+
+HEADER = ["batch", "filename", "material", "part_id", "copies", "next_step", "order_id", "technology"]
+
+
+class ConverterTestCase(unittest.TestCase):
+    """Gives each test a scratch directory and a silent converter logger."""
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.logger = logging.getLogger("converter.tests")
+        self.logger.addHandler(logging.NullHandler())
+        self.logger.propagate = False
+
+
+class ExcelReaderTests(ConverterTestCase):
+    def setUp(self):
+        super().setUp()
+        self.excel_path = self.write_workbook("20250101_01.xlsx", [
+            ["b1", "part", "PA12", 7, 2, datetime.date(2025, 1, 2), 1.5, "MJF"],
+            ["b2", "big", "PA12", 1e16, 3, 9999999999999998, 1e20, "MJF"],
+        ])
+        # Error cells (#N/A in filename, #DIV/0! in copies) as Excel stores them
+        self.error_excel_path = self.write_workbook("20250101_02.xlsx", [
+            ["b3", "#N/A", "PA12", 9, "#DIV/0!", "", "o", "MJF"],
+        ], error_cells=("B2", "E2"))
+
+    def write_workbook(self, name, rows, error_cells=()):
+        path = os.path.join(self.tmp.name, name)
+        wb = Workbook()
+        ws = wb.active
+        ws.append(HEADER)
+        for row in rows:
+            ws.append(row)
+        for ref in error_cells:
+            ws[ref].data_type = "e"
+        wb.save(path)
+        return path
+
+    def convert(self, calamine, excel_path=None):
+        with mock.patch.dict(sys.modules, {"python_calamine": calamine}):
+            return converter.convert_excel_to_meta_buffer(
+                excel_path or self.excel_path, self.logger).getvalue()
+
+    def test_openpyxl_writes_date_cells_as_datetimes(self):
+        meta = self.convert(None).splitlines()
+        self.assertEqual(meta[1], "b1,part.stl,PA12,7,2,2025-01-02 00:00:00,1.5,MJF")
+        self.assertEqual(meta[2], "b2,big.stl,PA12,1e+16,3,9999999999999998,1e+20,MJF")
+
+    def test_error_cells_are_kept(self):
+        meta = self.convert(None, self.error_excel_path).splitlines()
+        self.assertEqual(meta[1], "b3,#N/A.stl,PA12,9,#DIV/0!,,o,MJF")
+
+    @unittest.skipIf(python_calamine is None, "python-calamine not installed")
+    def test_calamine_output_matches_openpyxl(self):
+        self.assertEqual(self.convert(python_calamine), self.convert(None))
+        self.assertEqual(self.convert(python_calamine, self.error_excel_path),
+                         self.convert(None, self.error_excel_path))
+
+    def test_error_cells_are_detected(self):
+        self.assertTrue(converter.has_error_cells(self.error_excel_path))
+        self.assertFalse(converter.has_error_cells(self.excel_path))
+
+    def test_calamine_value_matches_openpyxl_types(self):
+        self.assertEqual(converter.calamine_value(7.0), 7)
+        self.assertIs(type(converter.calamine_value(7.0)), int)
+        self.assertEqual(converter.calamine_value(1.5), 1.5)
+        self.assertIs(type(converter.calamine_value(1e16)), float)
+        self.assertIs(type(converter.calamine_value(-1e16)), float)
+        self.assertEqual(converter.calamine_value(datetime.date(2025, 1, 2)),
+                         datetime.datetime(2025, 1, 2))
+        stamp = datetime.datetime(2025, 1, 2, 3, 4, 5)
+        self.assertEqual(converter.calamine_value(stamp), stamp)
+
+
+class PackagingTests(ConverterTestCase):
+    @mock.patch.object(converter, "MAX_ZIP_SIZE_BYTES", 300_000)
+    def test_parts_with_meta_stay_within_size_limit(self):
+        src = os.path.join(self.tmp.name, "stl")
+        os.mkdir(src)
+        for i in range(300):
+            with open(os.path.join(src, f"{'n' * 60}{i}.stl"), "wb") as fh:
+                fh.write(os.urandom(1000 + 17 * i))
+        meta_bytes = b"batch,filename\n" + b"b,part.stl\n" * 4000
+        files = sorted(os.scandir(src), key=lambda e: e.name)
+
+        archives = converter.plan_archives(files, "b", self.tmp.name, meta_bytes)
+        self.assertGreater(len(archives), 1)
+        for zip_path, entries in archives:
+            converter.write_zip_part(entries, zip_path, meta_bytes, self.logger)
+            self.assertLessEqual(os.path.getsize(zip_path), converter.MAX_ZIP_SIZE_BYTES)
+
+
+if __name__ == "__main__":
+    unittest.main()